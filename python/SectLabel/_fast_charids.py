@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""allennlp batch_to_ids 的快速替代：填充 (B, T, 50) 字符 id 张量的内层
+循环用 Numba njit(parallel=True) 编译成机器码并按 token 并行，
+替代 allennlp 里逐 token 逐字符的纯 Python 循环。
+
+字符 id 约定与 allennlp 的 ELMoCharacterMapper 一致：
+  每个 token 50 个槽位，[0]=BOW(258)，接 utf-8 字节（最多 48），再 EOW(259)，
+  其余补 padding(260)，最后整体 +1；padding token 整行保持 0。
+注意：ELMoCharacterMapper 对字面量 token "<S>"/"</S>" 有特殊编码，这里
+按普通字节处理——正常切词的文本不会出现这两个 token（句子边界由 Elmo
+模块内部添加），但输入里真含有它们时结果与 batch_to_ids 不同。
+numba 未安装或编译失败时（njit 首次调用才编译），调用方退回 batch_to_ids。
+"""
+import numpy as np
+from numba import njit, prange
+
+MAX_WORD_LENGTH = 50
+# 已含 +1 偏移
+BEGINNING_OF_WORD = 258 + 1
+END_OF_WORD = 259 + 1
+PADDING = 260 + 1
+
+@njit(parallel=True, cache=True)
+def pad_char_ids(flat_bytes, offsets, positions, out):
+    # flat_bytes: 全 batch token 的 utf-8 字节平铺 (uint8)
+    # offsets:    第 k 个 token 的字节区间 [offsets[k], offsets[k+1])
+    # positions:  第 k 个 token 在 out 里的 (batch, token) 下标
+    # out:        预分配好的 (B, T, 50) int32 零张量
+    for k in prange(offsets.shape[0] - 1):
+        b = positions[k, 0]
+        t = positions[k, 1]
+        start = offsets[k]
+        n = offsets[k + 1] - start
+        if n > MAX_WORD_LENGTH - 2:
+            n = MAX_WORD_LENGTH - 2
+        out[b, t, 0] = BEGINNING_OF_WORD
+        for i in range(n):
+            out[b, t, 1 + i] = flat_bytes[start + i] + 1
+        out[b, t, 1 + n] = END_OF_WORD
+        for i in range(2 + n, MAX_WORD_LENGTH):
+            out[b, t, i] = PADDING
+
+def batch_to_char_ids(tokens_list):
+    """与 batch_to_ids(tokens_list) 等价的 (B, T, 50) LongTensor
+    （不含字面量 "<S>"/"</S>" token 的输入，见模块 docstring）。"""
+    import torch
+    batch_size = len(tokens_list)
+    max_len = max(len(tokens) for tokens in tokens_list)
+    n_tokens = sum(len(tokens) for tokens in tokens_list)
+
+    flat = bytearray()
+    offsets = np.zeros(n_tokens + 1, dtype=np.int64)
+    positions = np.zeros((n_tokens, 2), dtype=np.int64)
+    k = 0
+    for b, tokens in enumerate(tokens_list):
+        for t, token in enumerate(tokens):
+            flat += token.encode("utf-8", "ignore")
+            offsets[k + 1] = len(flat)
+            positions[k, 0] = b
+            positions[k, 1] = t
+            k += 1
+
+    out = np.zeros((batch_size, max_len, MAX_WORD_LENGTH), dtype=np.int32)
+    pad_char_ids(np.frombuffer(bytes(flat), dtype=np.uint8), offsets, positions, out)
+    return torch.from_numpy(out).long()
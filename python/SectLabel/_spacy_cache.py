@@ -0,0 +1,11 @@
+# -*- coding: utf-8 -*-
+"""spacy.load 的进程内缓存：同一个 (模型名, disable 组合) 只反序列化一次
+（约 1-2 秒），之后直接复用同一个 pipeline 对象。"""
+from functools import lru_cache
+
+@lru_cache(maxsize=4)
+def get_nlp(name="en_core_web_sm", disable=(), exclude=()) -> "Language":
+    # 缓存键是 (name, tuple(disable), tuple(exclude))，所以两者都必须传 tuple。
+    # exclude 比 disable 更省：组件连权重都不加载，而不是加载后跳过
+    import spacy  # 延迟导入：只在第一次真的要加载模型时才付 import 成本
+    return spacy.load(name, disable=list(disable), exclude=list(exclude))
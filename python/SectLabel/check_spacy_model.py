@@ -1,8 +1,9 @@
-import spacy
+from _spacy_cache import get_nlp
 
 def main():
-    # 加载 en_core_web_sm 模型
-    nlp = spacy.load("en_core_web_sm")
+    # 加载 en_core_web_sm 模型（exclude 让用不到的组件连权重都不加载，
+    # pipe_names 只剩 tok2vec+tagger；get_nlp 带进程内缓存，重复调用不再反序列化）
+    nlp = get_nlp("en_core_web_sm", exclude=("parser", "ner", "attribute_ruler", "lemmatizer", "senter"))
 
     # 测试加载模型后对文本进行处理
     doc = nlp("This is a test sentence.")
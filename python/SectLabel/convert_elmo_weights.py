@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+"""一次性转换：把 ELMo 的 weights.hdf5 转存成 <weights>.safetensors。
+
+h5py 按 chunk 读 + Python 层 dtype 转换很慢；safetensors 加载是
+近乎带宽上限的 memcpy/零拷贝。转换后 model.build_elmo 会自动优先
+从 safetensors 加载（见 model.py），权重数值不变，只换容器格式。
+"""
+import argparse
+
+from model import resolve_path, DEFAULT_OPTIONS, DEFAULT_WEIGHTS
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Convert ELMo weights.hdf5 to a SafeTensors shard (one-shot)."
+    )
+    parser.add_argument("--options", help="Path to options.json（可不填，走默认/环境变量）")
+    parser.add_argument("--weights", help="Path to weights.hdf5（可不填，走默认/环境变量）")
+    args = parser.parse_args()
+
+    options_path = resolve_path(args.options, "ELMO_OPTIONS", DEFAULT_OPTIONS)
+    weights_path = resolve_path(args.weights, "ELMO_WEIGHTS", DEFAULT_WEIGHTS)
+
+    from allennlp.modules.elmo import Elmo
+    from safetensors.torch import save_file
+
+    # 经由 Elmo 构建再取 state_dict，保证 key 和加载端完全一致
+    elmo = Elmo(
+        options_file=options_path,
+        weight_file=weights_path,
+        num_output_representations=1,
+        dropout=0.0,
+        do_layer_norm=False,
+    )
+    state = {k: v.contiguous() for k, v in elmo.state_dict().items()}
+
+    out_path = weights_path + ".safetensors"
+    save_file(state, out_path)
+    print(f"已写入: {out_path}（{len(state)} tensors）")
+
+if __name__ == "__main__":
+    main()
@@ -1,42 +1,233 @@
 # -*- coding: utf-8 -*-
 import argparse
 import os
+import re
 import sys
-from allennlp.modules.elmo import Elmo, batch_to_ids
+import threading
+from functools import lru_cache
+from typing import List
 import torch
 
+# allennlp 的导入本身要好几秒，延迟到 build_elmo/run_once 里再做，
+# 让它和 argparse、文件预读并行进行（见 __main__ 处的预读线程）
+
 DEFAULT_OPTIONS = r"E:\models\elmo\elmo_2x4096_512_2048cnn_2xhighway_options.json"
 DEFAULT_WEIGHTS = r"E:\models\elmo\elmo_2x4096_512_2048cnn_2xhighway_weights.hdf5"
 
+# 空白切词：findall 在 C 里一趟扫完，省掉 strip+split 的两遍处理
+TOKEN_RE = re.compile(r"\S+")
+
+@lru_cache(maxsize=None)
 def resolve_path(cli_value: str, env_key: str, default_value: str) -> str:
-    # 优先用命令行，其次环境变量，最后默认值
+    """优先用命令行，其次环境变量，最后默认值。
+
+    结果按 (cli_value, env_key, default_value) 缓存，免得反复 build_elmo
+    时每次都 stat 文件；运行中改了环境变量需要 resolve_path.cache_clear()。
+    """
     path = cli_value or os.environ.get(env_key) or default_value
     if not path or not os.path.isfile(path):
         raise FileNotFoundError(f"文件不存在：{path}（可用 --{env_key[5:].lower()} 或设置环境变量 {env_key}）")
     return path
 
-def build_elmo(options_path: str, weights_path: str) -> Elmo:
-    return Elmo(
+def load_vocab(vocab_file: str) -> List[str]:
+    # 词表文件：一行一个词；下标 0 固定留给 padding（allennlp 用 >0 当 mask）
+    with open(vocab_file, "r", encoding="utf-8") as f:
+        words = [line.strip() for line in f if line.strip()]
+    return [""] + words
+
+def warm_page_cache(path: str):
+    # 顺序读一遍文件让内核把它放进 page cache；和 CPython 启动/argparse 并行跑
+    try:
+        with open(path, "rb") as f:
+            while f.read(16 * 1024 * 1024):
+                pass
+    except OSError:
+        pass  # 文件不存在等问题留给 resolve_path 报错
+
+def prefetch_weights(weights_path: str):
+    # 冷缓存下权重加载是 I/O 瓶颈：h5py 按 chunk 乱序读，顺序预取能快不少。
+    # Linux：fadvise 提示内核顺序预读整个文件；
+    # Windows（默认路径在 E:\）：没有 fadvise，后台线程整读一遍预热 page cache，
+    # 与 Elmo 构建模块骨架的时间重叠。
+    if hasattr(os, "posix_fadvise"):
+        try:
+            fd = os.open(weights_path, os.O_RDONLY)
+            try:
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL | os.POSIX_FADV_WILLNEED)
+            finally:
+                os.close(fd)
+        except OSError:
+            pass
+    else:
+        threading.Thread(target=warm_page_cache, args=(weights_path,), daemon=True).start()
+
+def _init_char_encoder_params(encoder):
+    """按 options.json 描述的结构把 CharCNN 的参数零初始化地建出来，
+    形状与 allennlp 0.9 _ElmoCharacterEncoder._load_weights 创建的一致；
+    数值随后由 load_state_dict 从 safetensors 填入。"""
+    from allennlp.modules.highway import Highway
+
+    cnn_options = encoder._options["char_cnn"]
+    char_embed_dim = cnn_options["embedding"]["dim"]
+    # 261 个字符 id + 1 行 padding
+    encoder._char_embedding_weights = torch.nn.Parameter(
+        torch.zeros(262, char_embed_dim), requires_grad=encoder.requires_grad
+    )
+
+    convolutions = []
+    for i, (width, num) in enumerate(cnn_options["filters"]):
+        conv = torch.nn.Conv1d(
+            in_channels=char_embed_dim, out_channels=num, kernel_size=width, bias=True
+        )
+        conv.weight.requires_grad = encoder.requires_grad
+        conv.bias.requires_grad = encoder.requires_grad
+        convolutions.append(conv)
+        encoder.add_module("char_conv_{}".format(i), conv)
+    encoder._convolutions = convolutions
+
+    n_filters = sum(f[1] for f in cnn_options["filters"])
+    encoder._highways = Highway(
+        n_filters, cnn_options["n_highway"], activation=torch.nn.functional.relu
+    )
+    for param in encoder._highways.parameters():
+        param.requires_grad = encoder.requires_grad
+
+    encoder._projection = torch.nn.Linear(n_filters, encoder.output_dim, bias=True)
+    encoder._projection.weight.requires_grad = encoder.requires_grad
+    encoder._projection.bias.requires_grad = encoder.requires_grad
+
+def _load_elmo_from_safetensors(options_path: str, weights_path: str, safetensors_path: str) -> "Elmo":
+    # 构建 Elmo 骨架时把两个 HDF5 读权重的方法临时换成只建参数/空操作，
+    # 然后整份 state_dict 从 safetensors 灌入（权重数值与 HDF5 完全相同）
+    from allennlp.modules.elmo import Elmo, _ElmoCharacterEncoder
+    from allennlp.modules.elmo_lstm import ElmoLstm
+    from safetensors.torch import load_file
+
+    orig_char_load = _ElmoCharacterEncoder._load_weights
+    orig_lstm_load = ElmoLstm.load_weights
+    _ElmoCharacterEncoder._load_weights = _init_char_encoder_params
+    ElmoLstm.load_weights = lambda self, weight_file: None
+    try:
+        elmo = Elmo(
+            options_file=options_path,
+            weight_file=weights_path,
+            num_output_representations=1,
+            dropout=0.0,
+            do_layer_norm=False,
+        )
+    finally:
+        _ElmoCharacterEncoder._load_weights = orig_char_load
+        ElmoLstm.load_weights = orig_lstm_load
+
+    elmo.load_state_dict(load_file(safetensors_path))
+    return elmo
+
+def build_elmo(options_path: str, weights_path: str, vocab: List[str] = None) -> "Elmo":
+    """同一组参数在进程内只构建一次（批量服务模式下反复调用直接复用实例）；
+    首次构建前的 prefetch/页缓存预热让权重常驻内存，冷读只发生一次。"""
+    return _build_elmo_cached(options_path, weights_path, tuple(vocab) if vocab else None)
+
+@lru_cache(maxsize=4)
+def _build_elmo_cached(options_path: str, weights_path: str, vocab_key) -> "Elmo":
+    from allennlp.modules.elmo import Elmo  # 延迟导入，与启动期 I/O 重叠
+    vocab = list(vocab_key) if vocab_key else None
+    # 冷启动大头是 HDF5 权重解析：第一次构建后把整个模块 torch.save 起来，
+    # 之后直接 torch.load，一次 mmap 读取代替 h5py 逐层解析。
+    # 传了 vocab 时模块结构依赖词表内容，不走缓存。
+    cache_path = weights_path + ".elmo.pt"
+    if vocab is None and os.path.isfile(cache_path):
+        try:
+            # PyTorch >= 2.1 支持 mmap，按需换页加载权重
+            return torch.load(cache_path, map_location="cpu", mmap=True)
+        except TypeError:
+            return torch.load(cache_path, map_location="cpu")
+
+    # convert_elmo_weights.py 转换过的话，从 safetensors 加载：
+    # 近乎带宽上限的 memcpy，跳过 h5py 的 chunk 读 + dtype 转换
+    safetensors_path = weights_path + ".safetensors"
+    if vocab is None and os.path.isfile(safetensors_path):
+        try:
+            return _load_elmo_from_safetensors(options_path, weights_path, safetensors_path)
+        except Exception as e:
+            sys.stderr.write(f"Warning: safetensors 加载失败（{e}），回退 HDF5。\n")
+
+    prefetch_weights(weights_path)
+
+    # vocab_to_cache 会预先算好词表内 token 的 context-insensitive 表示，
+    # 推理时对这些词跳过整个 CharCNN，只跑 biLSTM（CPU 上 CharCNN 最慢）
+    elmo = Elmo(
         options_file=options_path,
         weight_file=weights_path,
         num_output_representations=1,
         dropout=0.0,
         do_layer_norm=False,
+        vocab_to_cache=vocab,
     )
+    if vocab is None:
+        try:
+            torch.save(elmo, cache_path)
+        except OSError as e:
+            sys.stderr.write(f"Warning: 写入 ELMo 缓存失败（{e}），下次仍从 HDF5 加载。\n")
+    return elmo
+
+def run_once(elmo: "Elmo", texts: List[str], device: str = "cpu", vocab: List[str] = None):
+    # 整批句子一次前向：character-CNN/biLM 的开销在 batch 维度上摊薄，
+    # 比逐句调用快数倍（GPU 上更明显）
+    tokens_list = [TOKEN_RE.findall(t) for t in texts]
+    try:
+        # numba 编译的并行填充内核，跳过 allennlp 逐字符的纯 Python 循环。
+        # 宽 except：njit 在首次调用才编译，numba 装了但坏了（typing/lowering
+        # 报错、缓存过期）抛的是 numba 自己的异常，同样退回 batch_to_ids
+        from _fast_charids import batch_to_char_ids
+        character_ids = batch_to_char_ids(tokens_list)
+    except Exception:
+        from allennlp.modules.elmo import batch_to_ids
+        character_ids = batch_to_ids(tokens_list)
+    character_ids = character_ids.to(device)
 
-def run_once(elmo: Elmo, text: str):
-    tokens = text.strip().split()
-    character_ids = batch_to_ids([tokens])
-    with torch.no_grad():
-        out = elmo(character_ids)
-    elmo_repr = out["elmo_representations"][0]  # (1, seq_len, 1024)
-    print("Tokens:", tokens)
-    print("ELMo representation shape:", tuple(elmo_repr.shape))
-    if elmo_repr.shape[1] >= 2:
-        v0 = [round(x, 4) for x in elmo_repr[0, 0, :5].tolist()]
-        v1 = [round(x, 4) for x in elmo_repr[0, 1, :5].tolist()]
-        print("First token (5 dims):", v0)
-        print("Second token (5 dims):", v1)
+    # 全部 token 都在缓存词表里时才走 word_inputs 快路径；
+    # 有 OOV 就整批回退 CharCNN，避免把 OOV 当 padding 丢掉
+    word_inputs = None
+    if vocab:
+        word_to_id = {w: i for i, w in enumerate(vocab)}
+        if all(t in word_to_id for tokens in tokens_list for t in tokens):
+            max_len = max(len(tokens) for tokens in tokens_list)
+            word_inputs = torch.zeros(len(tokens_list), max_len, dtype=torch.long)
+            for i, tokens in enumerate(tokens_list):
+                for j, t in enumerate(tokens):
+                    word_inputs[i, j] = word_to_id[t]
+            word_inputs = word_inputs.to(device)
+
+    elmo.eval()
+    # inference_mode 比 no_grad 再省掉 version counter 维护（老版本 torch 回退 no_grad）
+    inference_ctx = getattr(torch, "inference_mode", torch.no_grad)
+    # torch < 1.6 没有 torch.cuda.amp：退回 FP32 前向
+    autocast = getattr(getattr(torch.cuda, "amp", None), "autocast", None)
+    with inference_ctx():
+        if device.startswith("cuda") and autocast is not None:
+            # FP16 自动混合精度：省一半显存带宽，tensor core 吞吐翻倍
+            try:
+                amp_ctx = autocast(dtype=torch.float16)
+            except TypeError:  # torch < 1.10 的 autocast 没有 dtype 参数
+                amp_ctx = autocast()
+            with amp_ctx:
+                out = elmo(character_ids, word_inputs=word_inputs)
+        else:
+            out = elmo(character_ids, word_inputs=word_inputs)
+    elmo_repr = out["elmo_representations"][0]  # (B, max_seq_len, 1024)
+    mask = out["mask"]  # (B, max_seq_len)，用于去掉 padding
+    print("Batch size:", len(tokens_list))
+    print("ELMo representation shape (padded):", tuple(elmo_repr.shape))
+    for i, tokens in enumerate(tokens_list):
+        seq_len = int(mask[i].sum().item())
+        sent_repr = elmo_repr[i, :seq_len]  # (seq_len, 1024)
+        print(f"[{i}] Tokens:", tokens)
+        print(f"[{i}] Shape:", tuple(sent_repr.shape))
+        if seq_len >= 2:
+            v0 = [round(x, 4) for x in sent_repr[0, :5].tolist()]
+            v1 = [round(x, 4) for x in sent_repr[1, :5].tolist()]
+            print(f"[{i}] First token (5 dims):", v0)
+            print(f"[{i}] Second token (5 dims):", v1)
 
 def main():
     parser = argparse.ArgumentParser(
@@ -49,15 +240,71 @@ def main():
         default="Calzolari , N. ( 1982 ) Towards the organization of lexical definitions",
         help="A test sentence to embed",
     )
+    parser.add_argument(
+        "--texts",
+        nargs="+",
+        help="Multiple sentences to embed in one batched forward pass（优先于 --text）",
+    )
+    parser.add_argument(
+        "--texts-file",
+        help="Path to a UTF-8 file, one sentence per line（优先于 --texts/--text）",
+    )
+    parser.add_argument(
+        "--device",
+        default="cpu",
+        help="cpu 或 cuda（cuda 不可用时自动回退 cpu）",
+    )
+    parser.add_argument(
+        "--vocab-file",
+        help="可选词表文件（一行一词）；传入后预缓存这些词的 CharCNN 表示",
+    )
+    parser.add_argument(
+        "--threads",
+        type=int,
+        help="CPU 线程数（默认取 OMP_NUM_THREADS 或机器核数）",
+    )
     args = parser.parse_args()
 
+    device = args.device
+    if device.startswith("cuda") and not torch.cuda.is_available():
+        sys.stderr.write("Warning: CUDA 不可用，回退到 CPU。\n")
+        device = "cpu"
+
     options_path = resolve_path(args.options, "ELMO_OPTIONS", DEFAULT_OPTIONS)
     weights_path = resolve_path(args.weights, "ELMO_WEIGHTS", DEFAULT_WEIGHTS)
 
-    elmo = build_elmo(options_path, weights_path)
-    run_once(elmo, args.text)
+    if args.texts_file:
+        with open(args.texts_file, "r", encoding="utf-8") as f:
+            texts = [line.strip() for line in f if line.strip()]
+    elif args.texts:
+        texts = args.texts
+    else:
+        texts = [args.text]
+
+    # CPU 矩阵乘：intra-op 吃满核数，inter-op 压到 1，
+    # 避免 MKL/OpenMP 线程池超订后在 matmul 之间空转自旋
+    if device == "cpu":
+        threads = args.threads or int(os.environ.get("OMP_NUM_THREADS", os.cpu_count()))
+        torch.set_num_threads(threads)
+        try:
+            torch.set_num_interop_threads(1)
+        except RuntimeError:
+            pass  # 并行工作已启动后不可再设，忽略
+
+    vocab = load_vocab(args.vocab_file) if args.vocab_file else None
+
+    elmo = build_elmo(options_path, weights_path, vocab=vocab)
+    elmo.to(device).eval()
+    run_once(elmo, texts, device=device, vocab=vocab)
 
 if __name__ == "__main__":
     if sys.version_info[:2] != (3, 7):
         sys.stderr.write("Warning: 推荐在 Python 3.7 + AllenNLP 0.9 环境下运行以避免兼容问题。\n")
+    # 一启动就后台预读 options/weights（环境变量或默认路径），
+    # 等 build_elmo 真正打开 HDF5 时文件已在内存里。daemon 线程：
+    # 提前报错退出（如 --weights 路径错）时不用等几百 MB 读完才能关进程。
+    # 注意：--options/--weights 指向别处时预读不到，首跑仍走磁盘。
+    for _path in (os.environ.get("ELMO_OPTIONS") or DEFAULT_OPTIONS,
+                  os.environ.get("ELMO_WEIGHTS") or DEFAULT_WEIGHTS):
+        threading.Thread(target=warm_page_cache, args=(_path,), daemon=True).start()
     main()
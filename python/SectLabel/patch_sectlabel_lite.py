@@ -2,7 +2,10 @@
 """
 把 sciwing\models\sectlabel.py 顶部无条件的 BowElmoEmbedder 导入
 改为：仅当非 LITE 时才导入；LITE 下设为 None，避免 allennlp 依赖。
+另外用 ast 扫描模块顶层的其它重量级导入（allennlp/spacy/torch.distributions），
+同样包上 LITE 开关：LITE 下省掉数秒导入时间和几百 MB 内存。
 """
+import ast
 import io
 import os
 from pathlib import Path
@@ -11,6 +14,70 @@ ROOT = Path(r"E:\programFile\AIProgram\docxServer\python\sciwing")
 TARGET = ROOT / "sciwing" / "models" / "sectlabel.py"
 BACKUP = TARGET.with_suffix(".py.bak_lite")
 
+# 顶层导入命中这些前缀就包 LITE 开关
+HEAVY_PREFIXES = ("allennlp", "spacy", "torch.distributions")
+
+LITE_CHECK = "str(os.getenv('SCIWING_LITE','')).lower() in ('1','true','yes','y')"
+
+def _heavy(dotted):
+    return any(dotted == p or dotted.startswith(p + ".") for p in HEAVY_PREFIXES)
+
+def gate_heavy_imports(src):
+    """返回 (patched_src, gated_names)。只处理单行的顶层 import 语句，
+    多行/带分号的跳过（sectlabel.py 里没有这种写法）。"""
+    lines = src.splitlines(keepends=True)
+    gated = []
+    tree = ast.parse(src)
+
+    # 不会被 gate 的顶层 import（非重量级的，以及没有 asname 的点分导入——
+    # 后者只能通过把顶层名设 None 来 gate，必然破坏别处使用）所绑定的名字：
+    # LITE 下对同名绑定再设 None 会覆盖掉真实模块
+    # （如先 `import torch` 再 gate `import torch.distributions`），不能碰
+    ungated_bound = set()
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            dotted_unaliased = any(a.asname is None and "." in a.name for a in node.names)
+            if dotted_unaliased or not _heavy(node.names[0].name):
+                ungated_bound.update(a.asname or a.name.split(".")[0] for a in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            if not _heavy(node.module or ""):
+                ungated_bound.update(a.asname or a.name for a in node.names)
+
+    replacements = []  # (行号从 1 起, 绑定的名字列表)
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            dotted = node.names[0].name
+            # `import a.b` 绑定的是顶层名 a；有 asname 时绑定 asname。
+            # 点分且无 asname，或与某个不 gate 的导入同名绑定的语句跳过
+            # （父包已在别处加载时子模块导入近乎免费，gate 反而只会坏事）
+            if any(a.asname is None and ("." in a.name or a.name in ungated_bound)
+                   for a in node.names):
+                continue
+            bound = [a.asname or a.name for a in node.names]
+        elif isinstance(node, ast.ImportFrom):
+            dotted = node.module or ""
+            bound = [a.asname or a.name for a in node.names]
+        else:
+            continue
+        if not _heavy(dotted):
+            continue
+        line = lines[node.lineno - 1]
+        stripped = line.strip()
+        if ";" in stripped or stripped.endswith("\\") or "(" in stripped:
+            continue  # 非单行语句，不碰
+        replacements.append((node.lineno, stripped, bound))
+
+    # 从后往前替换，行号不会漂移
+    for lineno, stmt, bound in reversed(replacements):
+        indent = "if " + LITE_CHECK + ":\n"
+        none_lines = "".join("    {} = None  # LITE 模式：跳过重量级导入\n".format(n) for n in bound)
+        block = "import os\n" + indent + none_lines + "else:\n    " + stmt + "\n"
+        lines[lineno - 1] = block
+
+    for _, _, bound in replacements:
+        gated.extend(bound)
+    return "".join(lines), gated
+
 def main():
     if not TARGET.exists():
         raise SystemExit(f"找不到文件: {TARGET}")
@@ -18,26 +85,36 @@ def main():
     src = TARGET.read_text(encoding="utf-8", errors="ignore")
 
     sentinel = "from sciwing.modules.embedders.bow_elmo_embedder import BowElmoEmbedder"
-    if sentinel not in src:
+    gated = []
+    if sentinel in src:
+        patched = src.replace(
+            sentinel,
+            (
+                "import os\n"
+                "if str(os.getenv('SCIWING_LITE','')).lower() in ('1','true','yes','y'):\n"
+                "    BowElmoEmbedder = None  # LITE 模式：不触发 allennlp 依赖\n"
+                "else:\n"
+                "    from sciwing.modules.embedders.bow_elmo_embedder import BowElmoEmbedder\n"
+            ),
+            1,
+        )
+        gated.append("BowElmoEmbedder")
+    else:
+        patched = src
+
+    # 其余重量级顶层导入（allennlp/spacy/torch.distributions）也包 LITE 开关
+    patched, heavy_gated = gate_heavy_imports(patched)
+    gated.extend(heavy_gated)
+
+    if not gated:
         print("未发现需要替换的导入行，可能此前已补丁或源码版本不同。略过。")
         return
 
-    patched = src.replace(
-        sentinel,
-        (
-            "import os\n"
-            "if str(os.getenv('SCIWING_LITE','')).lower() in ('1','true','yes','y'):\n"
-            "    BowElmoEmbedder = None  # LITE 模式：不触发 allennlp 依赖\n"
-            "else:\n"
-            "    from sciwing.modules.embedders.bow_elmo_embedder import BowElmoEmbedder\n"
-        ),
-        1,
-    )
-
     # 备份 + 写回
     BACKUP.write_text(src, encoding="utf-8")
     TARGET.write_text(patched, encoding="utf-8")
     print(f"已打补丁并备份：\n  备份: {BACKUP}\n  目标: {TARGET}")
+    print("LITE 下跳过的导入:", ", ".join(gated))
 
 if __name__ == "__main__":
     main()
@@ -3,6 +3,26 @@ import os
 import sys
 import platform
 import pkgutil
+from concurrent.futures import ThreadPoolExecutor
+
+from _spacy_cache import get_nlp
+
+try:
+    from importlib import metadata as importlib_metadata
+except ImportError:  # Python 3.7
+    import importlib_metadata
+
+# import 包名 -> pip 分发名（METADATA 里的名字）
+DIST_NAMES = {"google.protobuf": "protobuf"}
+
+def probe_version(name):
+    # 只读已安装包的 METADATA，不执行任何 __init__.py
+    try:
+        return importlib_metadata.version(DIST_NAMES.get(name, name))
+    except importlib_metadata.PackageNotFoundError:
+        return "NOT INSTALLED (PackageNotFoundError)"
+    except Exception as e:
+        return "NOT INSTALLED ({})".format(e)
 
 def safe_import(name):
     try:
@@ -14,13 +34,23 @@ def safe_import(name):
 def print_kv(k, v):
     print("{:<45} {}".format(k, v))
 
-def spaCy_smoke(spacy):
+def spacy_batch_tag(texts):
+    """批量 POS 标注：nlp.pipe 把 tok2vec 矩阵乘按 batch 合并，在 Cython
+    里流式过整条 pipeline，比逐句调用 nlp(text) 省掉每次的 Python/Thinc 开销。
+    返回 List[List[Tuple[str, str]]]，与 texts 一一对应。
+    注：n_process > 1 只对长语料划算（进程启动要重新加载模型），这里保持 1。
+    """
+    # 只做 POS：exclude 让用不到的组件连权重都不加载；get_nlp 带进程内缓存
+    nlp = get_nlp("en_core_web_sm", exclude=("parser", "ner", "attribute_ruler", "lemmatizer", "senter"))
+    docs = list(nlp.pipe(texts, batch_size=min(64, len(texts)), n_process=1))
+    return [[(t.text, t.pos_) for t in doc] for doc in docs]
+
+def spaCy_smoke(spacy, sentences=("This is a test sentence.",)):
     try:
         if spacy is None:
             raise RuntimeError("spacy not installed")
-        nlp = spacy.load("en_core_web_sm")
-        doc = nlp("This is a test sentence.")
-        print_kv("SPACY SMOKE", "OK -> " + str([(t.text, t.pos_) for t in doc]))
+        tagged = spacy_batch_tag(list(sentences))
+        print_kv("SPACY SMOKE", "OK -> " + str(tagged[0]))
     except Exception as e:
         print_kv("SPACY SMOKE", "FAILED -> " + str(e))
 
@@ -51,27 +81,39 @@ def main():
     print("PACKAGES")
     print("=" * 60)
 
-    pb, pb_err = safe_import("google.protobuf")
-    spacy, spacy_err = safe_import("spacy")
-    torch, torch_err = safe_import("torch")
-    gensim, gensim_err = safe_import("gensim")
-    tbx, tbx_err = safe_import("tensorboardX")
-    lmdb, lmdb_err = safe_import("lmdb")
-    sciwing, sciwing_err = safe_import("sciwing")
-
-    print_kv("protobuf", getattr(pb, "__version__", "N/A") if pb else "NOT INSTALLED ({})".format(pb_err))
-    print_kv("spacy", getattr(spacy, "__version__", "N/A") if spacy else "NOT INSTALLED ({})".format(spacy_err))
-    print_kv("torch", getattr(torch, "__version__", "N/A") if torch else "NOT INSTALLED ({})".format(torch_err))
-    print_kv("gensim", getattr(gensim, "__version__", "N/A") if gensim else "NOT INSTALLED ({})".format(gensim_err))
-    print_kv("tensorboardX", getattr(tbx, "__version__", "N/A") if tbx else "NOT INSTALLED ({})".format(tbx_err))
-    print_kv("lmdb", getattr(lmdb, "__version__", "N/A") if lmdb else "NOT INSTALLED ({})".format(lmdb_err))
-    print_kv("sciwing", getattr(sciwing, "__version__", "N/A") if sciwing else "NOT INSTALLED ({})".format(sciwing_err))
+    names = ["google.protobuf", "spacy", "torch", "gensim", "tensorboardX", "lmdb", "sciwing"]
+    if "--smoke-import" in sys.argv:
+        # 完整 import 验证包可加载；并发跑（import 读 .so/.pyd 时释放 GIL），
+        # 总耗时约等于最慢的那个包
+        with ThreadPoolExecutor(max_workers=8) as ex:
+            results = dict(zip(names, ex.map(safe_import, names)))
+        versions = {
+            n: getattr(results[n][0], "__version__", "N/A") if results[n][0]
+            else "NOT INSTALLED ({})".format(results[n][1])
+            for n in names
+        }
+    else:
+        # 默认只读 METADATA 拿版本号，毫秒级
+        versions = {n: probe_version(n) for n in names}
 
-    print("\n" + "=" * 60)
-    print("SMOKE TESTS")
-    print("=" * 60)
-    spaCy_smoke(spacy)
-    tbx_smoke(tbx)
+    print_kv("protobuf", versions["google.protobuf"])
+    print_kv("spacy", versions["spacy"])
+    print_kv("torch", versions["torch"])
+    print_kv("gensim", versions["gensim"])
+    print_kv("tensorboardX", versions["tensorboardX"])
+    print_kv("lmdb", versions["lmdb"])
+    print_kv("sciwing", versions["sciwing"])
+
+    # 懒加载：smoke 测试要真 import spacy/tensorboardX 并加载模型权重，
+    # 只在显式传 --smoke 时才做
+    if "--smoke" in sys.argv:
+        print("\n" + "=" * 60)
+        print("SMOKE TESTS")
+        print("=" * 60)
+        spacy, _ = safe_import("spacy")
+        tbx, _ = safe_import("tensorboardX")
+        spaCy_smoke(spacy)
+        tbx_smoke(tbx)
 
     print("\n" + "=" * 60)
     print("DONE")
@@ -1,10 +1,47 @@
 # smoke.py
+import importlib.util
 import sys
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from importlib import metadata as importlib_metadata
+except ImportError:  # Python 3.7
+    import importlib_metadata
+
 mods = ["lmdb","spacy","gensim","torch","tensorboardX","sciwing"]
-print("py:", sys.version, "\nexe:", sys.executable)
-for m in mods:
+
+# 默认只读安装包的 METADATA 拿版本号（几十 ms）；
+# 加 --smoke-import 才真正 import（验证包能不能加载，秒级）
+SMOKE_IMPORT = "--smoke-import" in sys.argv
+
+def safe_import(m):
     try:
         mod = __import__(m)
-        print(f"{m:12s} OK  {getattr(mod,'__version__','-')}")
+        return f"{m:12s} OK  {getattr(mod,'__version__','-')}"
     except Exception as e:
-        print(f"{m:12s} FAIL {e.__class__.__name__}: {e}")
+        return f"{m:12s} FAIL {e.__class__.__name__}: {e}"
+
+def probe_version(m):
+    # find_spec 只查 finder，微秒级回答"装没装"，不执行模块代码
+    try:
+        spec = importlib.util.find_spec(m)
+    except (ImportError, ValueError):
+        spec = None
+    if spec is None:
+        return f"{m:12s} MISSING"
+    try:
+        return f"{m:12s} OK  {importlib_metadata.version(m)}"
+    except importlib_metadata.PackageNotFoundError:
+        return f"{m:12s} OK  -"  # 可导入但没有 METADATA（如源码目录）
+    except Exception as e:
+        return f"{m:12s} FAIL {e.__class__.__name__}: {e}"
+
+print("py:", sys.version, "\nexe:", sys.executable)
+if SMOKE_IMPORT:
+    # 并发导入：耗时约等于最慢的那个包，而不是全部相加
+    with ThreadPoolExecutor(max_workers=8) as ex:
+        for line in ex.map(safe_import, mods):
+            print(line)
+else:
+    for m in mods:
+        print(probe_version(m))
@@ -1,5 +1,13 @@
 # verify_env.py
 import os, sys
+from concurrent.futures import ThreadPoolExecutor
+
+from _spacy_cache import get_nlp
+
+try:
+    from importlib import metadata as importlib_metadata
+except ImportError:  # Python 3.7
+    import importlib_metadata
 
 def safe_import(mod):
     try:
@@ -8,7 +16,16 @@ def safe_import(mod):
     except Exception as e:
         return None, f"FAIL ({e.__class__.__name__}: {e})"
 
-def main():
+def probe_version(mod):
+    # 只读安装包的 METADATA，不执行 __init__.py（import torch 本身要 1-2 秒）
+    try:
+        return f"OK ({importlib_metadata.version(mod)})"
+    except importlib_metadata.PackageNotFoundError:
+        return "FAIL (PackageNotFoundError)"
+    except Exception as e:
+        return f"FAIL ({e.__class__.__name__}: {e})"
+
+def print_versions():
     print("="*60)
     print("PYTHON")
     print("="*60)
@@ -27,21 +44,50 @@ def main():
     print("="*60)
     print("IMPORTS")
     print("="*60)
-    for name in ["lmdb", "spacy", "gensim", "torch", "tensorboardX", "sciwing"]:
-        mod, status = safe_import(name)
+    names = ["lmdb", "spacy", "gensim", "torch", "tensorboardX", "sciwing"]
+    if "--smoke-import" in sys.argv:
+        # 完整 import；并发跑（import 读磁盘/加载扩展时释放 GIL），
+        # 总耗时接近最慢包而非求和
+        with ThreadPoolExecutor(max_workers=8) as ex:
+            results = dict(zip(names, ex.map(safe_import, names)))
+    else:
+        # 默认只查 METADATA 版本号，毫秒级
+        results = {name: (None, probe_version(name)) for name in names}
+        results["lmdb"] = safe_import("lmdb")
+    for name in names:
+        mod, status = results[name]
         print(f"{name:20s}", status)
-        if name == "spacy" and mod:
-            try:
-                nlp = mod.load("en_core_web_sm")
-                doc = nlp("This is a test sentence.")
-                print("spacy pipeline:", [p for p in nlp.pipe_names])
-                print("spacy smoke:", [(t.text, t.pos_) for t in doc])
-            except Exception as e:
-                print("spacy model load:", f"FAIL ({e.__class__.__name__}: {e})")
         if name == "lmdb" and mod:
             print("lmdb path:", getattr(mod, "__file__", None))
     print()
 
+def run_smoke():
+    # 懒加载：只有显式要求 smoke 才 import spacy + 加载 ~50MB 模型权重
+    print("="*60)
+    print("SMOKE TESTS")
+    print("="*60)
+    mod, status = safe_import("spacy")
+    if mod is None:
+        print("spacy:", status)
+    else:
+        try:
+            # exclude 让用不到的组件连权重都不加载，pipe_names 只剩 tok2vec+tagger；
+            # get_nlp 带进程内缓存，和 probe_diag 一起跑时只加载一次
+            nlp = get_nlp("en_core_web_sm", exclude=("parser", "ner", "attribute_ruler", "lemmatizer", "senter"))
+            # nlp.pipe 批量跑，避免逐句调用的 per-call 开销
+            sentences = ["This is a test sentence."]
+            docs = list(nlp.pipe(sentences, batch_size=min(64, len(sentences)), n_process=1))
+            print("spacy pipeline:", [p for p in nlp.pipe_names])
+            print("spacy smoke:", [(t.text, t.pos_) for t in docs[0]])
+        except Exception as e:
+            print("spacy model load:", f"FAIL ({e.__class__.__name__}: {e})")
+    print()
+
+def main():
+    print_versions()
+    if "--smoke" in sys.argv:
+        run_smoke()
+
     print("="*60)
     print("DONE")
     print("="*60)